@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import sqlite3
+import glob
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime, timedelta
@@ -9,6 +10,27 @@ from datetime import datetime, timedelta
 plt.style.use('seaborn')
 sns.set_palette("husl")
 
+def connect_oms():
+    """Yield a connection to oms.db and to each monthly order partition
+
+    Orders and order items are written to oms_partitions/oms_YYYY_MM.db;
+    oms.db only holds customers and orders from before partitioning. Each
+    partition has oms.db attached so unqualified `customers` still resolves.
+    """
+    for path in ['oms.db'] + sorted(glob.glob('oms_partitions/oms_*.db')):
+        conn = sqlite3.connect(path)
+        if path != 'oms.db':
+            conn.execute("ATTACH DATABASE 'oms.db' AS oms")
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+def read_oms_query(query):
+    """Run a query against oms.db and every order partition and concatenate the results"""
+    frames = [pd.read_sql_query(query, conn) for conn in connect_oms()]
+    return pd.concat([df for df in frames if not df.empty] or frames[:1], ignore_index=True)
+
 def load_data():
     """Load data from both IMS and OMS databases"""
     # Connect to IMS database
@@ -33,11 +55,8 @@ def load_data():
         LEFT JOIN suppliers s ON p.supplier_id = s.id
     """, ims_conn)
     
-    # Connect to OMS database
-    oms_conn = sqlite3.connect('oms.db')
-    
-    # Get orders data
-    orders_df = pd.read_sql_query("""
+    # Get orders data from oms.db and every order partition
+    orders_df = read_oms_query("""
         SELECT 
             o.id as order_id,
             o.customer_id,
@@ -49,10 +68,10 @@ def load_data():
             c.email as customer_email
         FROM orders o
         LEFT JOIN customers c ON o.customer_id = c.id
-    """, oms_conn)
+    """)
     
     # Get order items data
-    order_items_df = pd.read_sql_query("""
+    order_items_df = read_oms_query("""
         SELECT 
             oi.id as item_id,
             oi.order_id,
@@ -61,11 +80,10 @@ def load_data():
             oi.unit_price,
             oi.total_price
         FROM order_items oi
-    """, oms_conn)
+    """)
     
     # Close connections
     ims_conn.close()
-    oms_conn.close()
     
     return products_df, orders_df, order_items_df
 
@@ -76,7 +94,7 @@ def inventory_analysis(products_df):
     # Basic statistics
     print("\nProduct Statistics:")
     print(f"Total number of products: {len(products_df)}")
-    print(f"Total inventory value: ${products_df['unit_price'].sum():,.2f}")
+    print(f"Total inventory value: ${(products_df['unit_price'] * products_df['stock_quantity']).sum():,.2f}")
     print(f"Average product price: ${products_df['unit_price'].mean():,.2f}")
     
     # Category analysis
@@ -1,10 +1,17 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from oms_partitions import PartitionRegistry, PartitionedSession
+
 # Database URLs
 IMS_DATABASE_URL = "sqlite:///./ims.db"
 OMS_DATABASE_URL = "sqlite:///./oms.db"
+OMS_PARTITION_DIR = "./oms_partitions"
+JOBS_DATABASE_URL = "sqlite:///./jobs.db"
+
+# Bump whenever models change so init_db re-runs schema creation
+SCHEMA_VERSION = 4
 
 # Create engines
 ims_engine = create_engine(
@@ -17,13 +24,28 @@ oms_engine = create_engine(
     connect_args={"check_same_thread": False}
 )
 
-# Create sessions
-IMSSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=ims_engine)
-OMSSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=oms_engine)
+jobs_engine = create_engine(
+    JOBS_DATABASE_URL,
+    connect_args={"check_same_thread": False}
+)
 
 # Create base class for models
 Base = declarative_base()
 
+# Orders and order items are split into per-month databases; oms.db keeps
+# customers, the order directory and any orders written before partitioning
+oms_partitions = PartitionRegistry(oms_engine, OMS_PARTITION_DIR, Base.metadata)
+
+# Create sessions
+IMSSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=ims_engine)
+OMSSessionLocal = sessionmaker(
+    class_=PartitionedSession,
+    partitions=oms_partitions,
+    autocommit=False,
+    autoflush=False
+)
+JobsSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=jobs_engine)
+
 # Database dependency functions
 def get_ims_db():
     db = IMSSessionLocal()
@@ -39,8 +61,45 @@ def get_oms_db():
     finally:
         db.close()
 
-# Initialize databases
+def get_jobs_db():
+    db = JobsSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _schema_is_current(engine):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar() == SCHEMA_VERSION
+
+def _create_schema(engine, tables=None):
+    # create_all skips existing tables, so add columns and indexes introduced later explicitly
+    Base.metadata.create_all(bind=engine, tables=tables)
+    for table in tables or Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                    )
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def _mark_schema_current(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+# Initialize databases, skipping any already at SCHEMA_VERSION
 def init_db():
-    from models import Product, Supplier, Customer, Order, OrderItem
-    Base.metadata.create_all(bind=ims_engine)  # Create IMS tables
-    Base.metadata.create_all(bind=oms_engine)  # Create OMS tables
+    from models import Product, Supplier, Customer, Order, OrderItem, Job
+    if not _schema_is_current(ims_engine):
+        _create_schema(ims_engine)  # Create IMS tables
+        _mark_schema_current(ims_engine)
+    if not _schema_is_current(oms_engine):
+        _create_schema(oms_engine)  # Create OMS tables
+        oms_partitions.init()  # Create the order and order item directories for partitioned orders
+        _mark_schema_current(oms_engine)
+    if not _schema_is_current(jobs_engine):
+        _create_schema(jobs_engine, tables=[Job.__table__])  # Create job table
+        _mark_schema_current(jobs_engine)
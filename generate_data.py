@@ -7,6 +7,9 @@ from database import get_ims_db, get_oms_db
 
 fake = Faker()
 
+# Report order generation progress (and check for cancellation) every N orders
+ORDER_PROGRESS_INTERVAL = 25
+
 def generate_suppliers(db: Session, count: int = 50):
     suppliers = []
     for _ in range(count):
@@ -60,14 +63,17 @@ def generate_customers(db: Session, count: int = 100):
     db.commit()
     return customers
 
-def generate_orders(db: Session, customers: list, ims_db: Session, count: int = 300):
+def generate_orders(db: Session, customers: list, ims_db: Session, count: int = 300, progress=None):
     orders = []
     order_items = []
     
     # Get all products from IMS
     products = ims_db.query(Product).all()
     
-    for _ in range(count):
+    for n in range(count):
+        if progress and n % ORDER_PROGRESS_INTERVAL == 0:
+            progress(n / count, f"Generating orders ({n}/{count})...")
+
         # Create order
         order_date = fake.date_time_between(start_date='-1y', end_date='now')
         status = random.choice(['pending', 'processing', 'shipped', 'delivered', 'cancelled'])
@@ -106,25 +112,33 @@ def generate_orders(db: Session, customers: list, ims_db: Session, count: int =
     db.commit()
     return orders
 
-def generate_sample_data():
+def generate_sample_data(progress=None):
+    # Report each stage to the optional progress(fraction, message) callback
+    def report(fraction, message):
+        print(message)
+        if progress:
+            progress(fraction, message)
+
     # Get database sessions
     ims_db = next(get_ims_db())
     oms_db = next(get_oms_db())
     
     try:
         # Generate IMS data
-        print("Generating suppliers...")
+        report(0.0, "Generating suppliers...")
         suppliers = generate_suppliers(ims_db)
         
-        print("Generating products...")
+        report(0.1, "Generating products...")
         products = generate_products(ims_db, suppliers)
         
         # Generate OMS data
-        print("Generating customers...")
+        report(0.3, "Generating customers...")
         customers = generate_customers(oms_db)
         
-        print("Generating orders...")
-        orders = generate_orders(oms_db, customers, ims_db)
+        orders = generate_orders(
+            oms_db, customers, ims_db,
+            progress=lambda fraction, message: report(0.4 + 0.6 * fraction, message)
+        )
         
         print("Sample data generation completed successfully!")
         
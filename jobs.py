@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import update
+
+from database import JobsSessionLocal
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+def _process_token(pid: int) -> Optional[str]:
+    """Return the start time of a process (Linux only), which differs between processes reusing a pid"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Field 22 (starttime) counting from the state field after the parenthesised name
+            return f.read().rpartition(")")[2].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+# Identifies the process that claimed a running job as host:pid:token; the
+# token tells this process apart from an earlier one with the same pid
+# (containers restart as pid 1)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{_process_token(os.getpid()) or uuid.uuid4().hex}"
+
+# Registered job functions, keyed by job kind
+JOB_TYPES: Dict[str, Callable] = {}
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once cancellation has been requested"""
+
+
+def _worker_is_dead(worker: Optional[str]) -> bool:
+    """Return True if worker names a process on this host that no longer exists"""
+    if not worker:
+        return True
+    host, _, pid = worker.partition(":")
+    pid, _, token = pid.partition(":")  # Ids recorded by older versions have no token
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    if token:
+        if int(pid) == os.getpid():
+            return worker != WORKER_ID
+        current = _process_token(int(pid))
+        if current is not None:
+            return current != token
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def register_job(kind: str):
+    """Register a function as a job kind; it is called as fn(context, **params)"""
+    def decorator(fn):
+        JOB_TYPES[kind] = fn
+        return fn
+    return decorator
+
+
+class JobContext:
+    """Handle passed to a running job for reporting progress and checking cancellation"""
+
+    def __init__(self, runner: "JobRunner", job_id: int):
+        self.runner = runner
+        self.job_id = job_id
+
+    def progress(self, fraction: float, message: Optional[str] = None):
+        """Record progress (0-1) and stop the job if it has been cancelled"""
+        job = self.runner._update(self.job_id, progress=min(max(fraction, 0.0), 1.0), message=message)
+        if job.cancel_requested:
+            raise JobCancelled(f"Job {self.job_id} cancelled")
+
+    def check_cancelled(self):
+        """Stop the job if it has been cancelled"""
+        if self.runner._get(self.job_id).cancel_requested:
+            raise JobCancelled(f"Job {self.job_id} cancelled")
+
+
+class JobRunner:
+    """Runs registered jobs on a bounded thread pool and persists their state"""
+
+    def __init__(self, session_factory=JobsSessionLocal, max_workers: int = 2, worker_id: str = WORKER_ID):
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self.worker_id = worker_id
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _get(self, job_id: int) -> Optional[Job]:
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _update(self, job_id: int, **values) -> Job:
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            for key, value in values.items():
+                setattr(job, key, value)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _transition(self, job_id: int, from_status: str, *criteria, **values) -> bool:
+        """Atomically update a job only if it is still in from_status; return whether it was"""
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(Job).where(Job.id == job_id, Job.status == from_status, *criteria).values(**values)
+            )
+            db.commit()
+            return result.rowcount == 1
+        finally:
+            db.close()
+
+    def _finish(self, job_id: int, status: str, **values) -> bool:
+        """Move a job this worker is running to a final status"""
+        return self._transition(
+            job_id, RUNNING, Job.worker == self.worker_id,
+            status=status, finished_at=datetime.utcnow(), **values
+        )
+
+    def _enqueue(self, job_id: int):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            self._futures[job_id] = self._executor.submit(self._run, job_id)
+
+    def submit(self, kind: str, **params) -> Job:
+        """Persist a new job and queue it for execution"""
+        if kind not in JOB_TYPES:
+            raise ValueError(f"Unknown job kind: {kind}")
+        db = self.session_factory()
+        try:
+            job = Job(kind=kind, status=QUEUED, progress=0, params=json.dumps(params))
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+        finally:
+            db.close()
+        self._enqueue(job.id)
+        return job
+
+    def cancel(self, job_id: int) -> Optional[Job]:
+        """Request cancellation; queued jobs stop immediately, running ones at their next progress report"""
+        job = self._get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        job = self._update(job_id, cancel_requested=True)
+        with self._lock:
+            future = self._futures.get(job_id)
+        if job.status == QUEUED and (future is None or future.cancel()):
+            self._transition(job_id, QUEUED, status=CANCELLED, finished_at=datetime.utcnow())
+            job = self._get(job_id)
+        return job
+
+    def _run(self, job_id: int):
+        try:
+            self._execute(job_id)
+        except Exception as e:
+            # Anything failing outside the job itself (a missing row, a locked
+            # database) must still leave the job in a final state
+            logger.exception("Job %s failed", job_id)
+            try:
+                failed = dict(status=FAILED, error=str(e), finished_at=datetime.utcnow())
+                if not self._transition(job_id, RUNNING, Job.worker == self.worker_id, **failed):
+                    self._transition(job_id, QUEUED, **failed)
+            except Exception:
+                logger.exception("Could not record failure of job %s", job_id)
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+
+    def _execute(self, job_id: int):
+        # Claim the job; another worker may already have claimed or cancelled it
+        claimed = self._transition(
+            job_id, QUEUED, Job.cancel_requested.isnot(True),
+            status=RUNNING, worker=self.worker_id, started_at=datetime.utcnow()
+        )
+        if not claimed:
+            self._transition(
+                job_id, QUEUED, Job.cancel_requested.is_(True),
+                status=CANCELLED, finished_at=datetime.utcnow()
+            )
+            return
+
+        job = self._get(job_id)
+        context = JobContext(self, job_id)
+        try:
+            result = JOB_TYPES[job.kind](context, **json.loads(job.params or "{}"))
+        except JobCancelled:
+            self._finish(job_id, CANCELLED)
+        except Exception as e:
+            self._finish(job_id, FAILED, error=str(e))
+        else:
+            self._finish(job_id, SUCCEEDED, progress=1.0, result=json.dumps(result))
+
+    def recover(self):
+        """Queue jobs still waiting to run and fail running jobs whose worker process has died
+
+        Every worker calls this at startup; claiming in _execute ensures each
+        queued job still runs only once.
+        """
+        db = self.session_factory()
+        try:
+            running = db.query(Job.id, Job.worker).filter(Job.status == RUNNING).all()
+            queued = [job.id for job in db.query(Job.id).filter(Job.status == QUEUED).order_by(Job.id)]
+        finally:
+            db.close()
+        for job_id, worker in running:
+            if _worker_is_dead(worker):
+                criteria = Job.worker.is_(None) if worker is None else Job.worker == worker
+                self._transition(
+                    job_id, RUNNING, criteria,
+                    status=FAILED, error="Worker process exited while the job was running",
+                    finished_at=datetime.utcnow()
+                )
+        for job_id in queued:
+            self._enqueue(job_id)
+
+    def shutdown(self):
+        """Stop accepting work and cancel jobs that have not started"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_runner = JobRunner()
+
+
+@register_job("generate-data")
+def generate_data_job(context: JobContext):
+    from generate_data import generate_sample_data
+    generate_sample_data(progress=context.progress)
+    return {"message": "Sample data generated successfully"}
@@ -1,12 +1,14 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
-import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Literal
+from datetime import datetime
 
-from database import get_ims_db, get_oms_db, init_db
-from models import Product, Supplier, Customer, Order, OrderItem
+from database import get_ims_db, get_oms_db, get_jobs_db, init_db
+from models import Product, Supplier, Customer, Order, OrderItem, Job
 import schemas
-from generate_data import generate_sample_data
+from jobs import job_runner
+from valuation import valuation_page
+from oms_partitions import PartitionDetached
 
 app = FastAPI(
     title="Supply Chain Management API",
@@ -18,16 +20,17 @@ app = FastAPI(
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    job_runner.recover()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    job_runner.shutdown()
 
 # Data Management Endpoints
-@app.post("/api/generate-data")
+@app.post("/api/generate-data", status_code=202, response_model=schemas.Job)
 async def generate_data():
-    """Generate sample data for both IMS and OMS databases"""
-    try:
-        generate_sample_data()
-        return {"message": "Sample data generated successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """Start a background job generating sample data for both IMS and OMS databases"""
+    return job_runner.submit("generate-data")
 
 @app.post("/api/clear-data")
 async def clear_data(
@@ -53,6 +56,28 @@ async def clear_data(
         oms_db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+# Job Endpoints
+@app.get("/api/jobs", response_model=List[schemas.Job])
+async def get_jobs(db: Session = Depends(get_jobs_db)):
+    """Get all background jobs, newest first"""
+    return db.query(Job).order_by(Job.id.desc()).all()
+
+@app.get("/api/jobs/{job_id}", response_model=schemas.Job)
+async def get_job(job_id: int, db: Session = Depends(get_jobs_db)):
+    """Get status and progress of a background job"""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs/{job_id}/cancel", status_code=202, response_model=schemas.Job)
+async def cancel_job(job_id: int):
+    """Request cancellation of a background job"""
+    job = job_runner.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 # Inventory Management Endpoints
 @app.get("/api/inventory", response_model=List[schemas.Product])
 async def get_inventory(db: Session = Depends(get_ims_db)):
@@ -79,14 +104,26 @@ async def get_low_stock_products(db: Session = Depends(get_ims_db)):
 
 # Order Management Endpoints
 @app.get("/api/orders", response_model=List[schemas.Order])
-async def get_orders(db: Session = Depends(get_oms_db)):
-    """Get all orders"""
-    return db.query(Order).all()
+async def get_orders(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_oms_db)
+):
+    """Get all orders, optionally limited to an order date range"""
+    query = db.query(Order)
+    if start_date:
+        query = query.filter(Order.order_date >= start_date)
+    if end_date:
+        query = query.filter(Order.order_date <= end_date)
+    return query.all()
 
 @app.get("/api/orders/{order_id}", response_model=schemas.Order)
 async def get_order(order_id: int, db: Session = Depends(get_oms_db)):
     """Get specific order details"""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    try:
+        order = db.query(Order).filter(Order.id == order_id).first()
+    except PartitionDetached:
+        raise HTTPException(status_code=410, detail="Order has been archived")
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
@@ -100,6 +137,8 @@ async def get_customers(db: Session = Depends(get_oms_db)):
 @app.get("/analytics/inventory", response_model=schemas.InventoryAnalytics)
 async def get_inventory_analytics(db: Session = Depends(get_ims_db)):
     """Get inventory analytics"""
+    import pandas as pd  # Deferred: importing pandas adds ~0.4s to worker startup
+
     products = db.query(Product).all()
     df = pd.DataFrame([{
         'id': p.id,
@@ -111,20 +150,50 @@ async def get_inventory_analytics(db: Session = Depends(get_ims_db)):
     
     analytics = {
         'total_products': len(products),
-        'total_value': float(df['unit_price'].sum()),
-        'low_stock_items': int(df[df['stock_quantity'] <= df['reorder_point']].count()),
+        'total_value': float((df['unit_price'] * df['stock_quantity']).sum()),
+        'low_stock_items': int((df['stock_quantity'] <= df['reorder_point']).sum()),
         'categories_distribution': df['category'].value_counts().to_dict(),
         'avg_price_by_category': df.groupby('category')['unit_price'].mean().to_dict()
     }
     
     return analytics
 
+ValuationSort = Literal[
+    "inventory_value", "sku_count", "low_stock_count", "units_sold", "revenue", "sales_velocity"
+]
+
+@app.get("/analytics/suppliers", response_model=schemas.SupplierPerformancePage)
+async def get_supplier_performance(
+    days: int = Query(90, ge=1, le=3650),
+    sort_by: ValuationSort = "inventory_value",
+    descending: bool = True,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_ims_db)
+):
+    """Get inventory valuation, low stock counts and sales velocity per supplier"""
+    return valuation_page(db, "supplier", days, sort_by, descending, skip, limit)
+
+@app.get("/analytics/inventory/categories", response_model=schemas.CategoryValuationPage)
+async def get_category_valuation(
+    days: int = Query(90, ge=1, le=3650),
+    sort_by: ValuationSort = "inventory_value",
+    descending: bool = True,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_ims_db)
+):
+    """Get inventory valuation, low stock counts and sales velocity per category"""
+    return valuation_page(db, "category", days, sort_by, descending, skip, limit)
+
 @app.get("/analytics/orders", response_model=schemas.OrderAnalytics)
 async def get_order_analytics(
     oms_db: Session = Depends(get_oms_db),
     ims_db: Session = Depends(get_ims_db)
 ):
     """Get order analytics"""
+    import pandas as pd
+
     orders = oms_db.query(Order).all()
     order_items = oms_db.query(OrderItem).all()
     
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -29,8 +29,8 @@ class Product(Base):
     unit_price = Column(Float)
     stock_quantity = Column(Integer)
     reorder_point = Column(Integer)
-    category = Column(String)
-    supplier_id = Column(Integer, ForeignKey("suppliers.id"))
+    category = Column(String, index=True)
+    supplier_id = Column(Integer, ForeignKey("suppliers.id"), index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -78,3 +78,21 @@ class OrderItem(Base):
 
     # Relationships
     order = relationship("Order", back_populates="items")
+
+# Background Job Models
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, index=True)
+    status = Column(String, index=True)  # queued, running, succeeded, failed, cancelled
+    progress = Column(Float, default=0)
+    message = Column(Text, nullable=True)
+    params = Column(Text, nullable=True)  # JSON encoded keyword arguments
+    result = Column(Text, nullable=True)  # JSON encoded return value
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, default=False)
+    worker = Column(String, nullable=True)  # host:pid:token of the process running the job
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
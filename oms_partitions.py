@@ -0,0 +1,551 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Callable, List, Optional
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, event, func, inspect, select
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.horizontal_shard import ShardedSession, execute_and_instances, set_shard_id
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.loading import merge_frozen_result
+from sqlalchemy.sql import Select, operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, Label, UnaryExpression
+from sqlalchemy.sql.functions import FunctionElement
+
+# Partition holding customers and any orders written before partitioning
+DEFAULT_PARTITION = "default"
+
+# Tables split by order month; everything else stays in the default partition
+PARTITIONED_TABLES = ("orders", "order_items")
+
+# Maps every order id to the partition holding it, and hands out new ids so
+# they stay unique across partitions
+directory_metadata = MetaData()
+order_directory = Table(
+    "order_directory",
+    directory_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("partition", String, nullable=False),
+    sqlite_autoincrement=True,
+)
+
+# Hands out order item ids so they stay unique across partitions, and records
+# each item's order so an item can be found by id
+order_item_directory = Table(
+    "order_item_directory",
+    directory_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("order_id", Integer, nullable=True),
+    sqlite_autoincrement=True,
+)
+
+
+class PartitionDetached(LookupError):
+    """Raised when routing to a partition that has been moved to the archive"""
+
+
+class UnsupportedPartitionQuery(NotImplementedError):
+    """Raised for a query spanning partitions whose results cannot be merged correctly"""
+
+
+def partition_key(order_date) -> str:
+    """Return the partition key (YYYY_MM) for an order date"""
+    return f"{order_date.year:04d}_{order_date.month:02d}"
+
+
+class PartitionRegistry:
+    """Per-month SQLite databases for orders and order items"""
+
+    def __init__(self, default_engine, directory: str, metadata: MetaData, max_workers: int = 8):
+        self.default_engine = default_engine
+        self.directory = directory
+        self.archive_directory = os.path.join(directory, "archive")
+        self.metadata = metadata
+        self.max_workers = max_workers
+        self._engines = {DEFAULT_PARTITION: default_engine}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"oms_{key}.db")
+
+    def _archive_path(self, key: str) -> str:
+        return os.path.join(self.archive_directory, f"oms_{key}.db")
+
+    def _tables(self):
+        return [self.metadata.tables[name] for name in PARTITIONED_TABLES]
+
+    def init(self):
+        """Create the order and order item directories and seed them past any existing ids"""
+        os.makedirs(self.directory, exist_ok=True)
+        directory_metadata.create_all(bind=self.default_engine)
+        orders = self.metadata.tables["orders"]
+        with self.default_engine.begin() as conn:
+            if not conn.execute(select(func.count()).select_from(order_directory)).scalar():
+                max_id = conn.execute(select(func.max(orders.c.id))).scalar()
+                if max_id:
+                    conn.execute(order_directory.insert().values(id=max_id, partition=DEFAULT_PARTITION))
+            seed_items = not conn.execute(select(func.count()).select_from(order_item_directory)).scalar()
+        if seed_items:
+            max_id = self._max_order_item_id()
+            if max_id:
+                with self.default_engine.begin() as conn:
+                    conn.execute(order_item_directory.insert().values(id=max_id, order_id=None))
+
+    def _max_order_item_id(self) -> Optional[int]:
+        """Return the largest order item id in any partition, attached or archived"""
+        query = select(func.max(self.metadata.tables["order_items"].c.id))
+        max_ids = []
+        for engine in [self.default_engine] + [self.engine(key, create=False) for key in self.keys()]:
+            with engine.connect() as conn:
+                max_ids.append(conn.execute(query).scalar())
+        if os.path.isdir(self.archive_directory):
+            for name in os.listdir(self.archive_directory):
+                if name.endswith(".db"):
+                    engine = create_engine(f"sqlite:///{os.path.join(self.archive_directory, name)}")
+                    with engine.connect() as conn:
+                        max_ids.append(conn.execute(query).scalar())
+                    engine.dispose()
+        return max((max_id for max_id in max_ids if max_id is not None), default=None)
+
+    def engine(self, key: str, create: bool = True):
+        """Return the engine for a partition, creating its database on first write"""
+        engine = self._engines.get(key)
+        if engine is not None:
+            return engine
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is not None:
+                return engine
+            if os.path.exists(self._archive_path(key)):
+                raise PartitionDetached(f"Partition {key} is detached")
+            path = self._path(key)
+            if not create and not os.path.exists(path):
+                raise ValueError(f"Partition {key} does not exist")
+            os.makedirs(self.directory, exist_ok=True)
+            engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+            self.metadata.create_all(bind=engine, tables=self._tables())
+            self._engines[key] = engine
+            return engine
+
+    def keys(self, start=None, end=None) -> List[str]:
+        """Return the attached month partitions overlapping [start, end]"""
+        if not os.path.isdir(self.directory):
+            return []
+        keys = sorted(
+            name[len("oms_"):-len(".db")]
+            for name in os.listdir(self.directory)
+            if name.startswith("oms_") and name.endswith(".db")
+        )
+        if start is not None:
+            keys = [k for k in keys if k >= partition_key(start)]
+        if end is not None:
+            keys = [k for k in keys if k <= partition_key(end)]
+        return keys
+
+    def shards_for(self, start=None, end=None) -> List[str]:
+        """Return every shard a query bounded by [start, end] has to visit"""
+        return [DEFAULT_PARTITION] + self.keys(start, end)
+
+    def map(self, fn: Callable[[str, Session], object], keys: List[str]) -> list:
+        """Run fn(key, session) for each shard on the thread pool and return (key, result) pairs
+
+        Each call gets its own Session bound to a single partition. Partitions
+        detached after the keys were listed are skipped.
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="oms-partition"
+                    )
+
+        def run(key):
+            try:
+                engine = self.engine(key, create=False)
+            except PartitionDetached:
+                return key, _DETACHED
+            with Session(bind=engine) as session:
+                return key, fn(key, session)
+
+        return [(key, result) for key, result in self._executor.map(run, keys) if result is not _DETACHED]
+
+    def fan_out(self, fn: Callable[[Session], object], start=None, end=None) -> list:
+        """Run fn against every shard touched by [start, end] in parallel, returning results in shard order"""
+        return [result for _, result in self.map(lambda key, session: fn(session), self.shards_for(start, end))]
+
+    def compact(self, key: str):
+        """VACUUM a partition database"""
+        with self.engine(key, create=False).connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+
+    def detach(self, key: str):
+        """Move a cold partition into the archive directory so reads skip it"""
+        if key == DEFAULT_PARTITION:
+            raise ValueError("The default partition cannot be detached")
+        with self._lock:
+            engine = self._engines.pop(key, None)
+            if engine is not None:
+                engine.dispose()
+            os.makedirs(self.archive_directory, exist_ok=True)
+            shutil.move(self._path(key), self._archive_path(key))
+
+    def attach(self, key: str):
+        """Bring an archived partition back into routing"""
+        with self._lock:
+            shutil.move(self._archive_path(key), self._path(key))
+
+
+_DETACHED = object()
+
+
+def _conjuncts(clause):
+    if clause is None:
+        return []
+    if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+        return [c for sub in clause.clauses for c in _conjuncts(sub)]
+    return [clause]
+
+
+def _column_is(expr, table_name: str, column_name: str) -> bool:
+    table = getattr(expr, "table", None)
+    return getattr(expr, "key", None) == column_name and getattr(table, "name", None) == table_name
+
+
+def _bind_value(expr, parameters=None):
+    if isinstance(expr, BindParameter):
+        if parameters and expr.key in parameters:
+            return parameters[expr.key]
+        return expr.effective_value
+    return None
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return None
+
+
+def _order_criteria(statement, parameters=None):
+    """Pull order ids and an order_date range out of a statement's AND-ed WHERE clause
+
+    Order ids come from orders.id or order_items.order_id compared with = or IN.
+    """
+    order_ids = start = end = None
+    for criterion in _conjuncts(getattr(statement, "whereclause", None)):
+        if not isinstance(criterion, BinaryExpression):
+            continue
+        left, right, op = criterion.left, criterion.right, criterion.operator
+        if _column_is(left, "orders", "id") or _column_is(left, "order_items", "order_id"):
+            value = _bind_value(right, parameters)
+            if op is operators.eq and value is not None:
+                order_ids = [value]
+            elif op is operators.in_op and value:
+                order_ids = list(value)
+        elif _column_is(left, "orders", "order_date"):
+            if op is operators.between_op and len(getattr(right, "clauses", ())) == 2:
+                low, high = (_as_date(_bind_value(bound, parameters)) for bound in right.clauses)
+                start, end = low or start, high or end
+            elif op in (operators.ge, operators.gt):
+                start = _as_date(_bind_value(right, parameters)) or start
+            elif op in (operators.le, operators.lt):
+                end = _as_date(_bind_value(right, parameters)) or end
+            elif op is operators.eq:
+                start = end = _as_date(_bind_value(right, parameters)) or start
+    return order_ids, start, end
+
+
+# Aggregates whose per-partition values can be combined, and how
+_MERGEABLE_AGGREGATES = {
+    "count": lambda values: sum(values),
+    "sum": lambda values: sum(values) if values else None,
+    "min": lambda values: min(values) if values else None,
+    "max": lambda values: max(values) if values else None,
+}
+_AGGREGATES = set(_MERGEABLE_AGGREGATES) | {"avg", "total", "group_concat"}
+
+
+def _function_name(expr) -> str:
+    return str(getattr(expr, "name", "")).lower() if isinstance(expr, FunctionElement) else ""
+
+
+def _aggregate_name(column) -> Optional[str]:
+    """Return the aggregate a selected column consists of, e.g. count for count(*) AS n"""
+    if isinstance(column, Label):
+        column = column.element
+    name = _function_name(column)
+    return name if name in _MERGEABLE_AGGREGATES else None
+
+
+def _contains_aggregate(column) -> bool:
+    return any(_function_name(expr) in _AGGREGATES for expr in visitors.iterate(column))
+
+
+def _is_windowed(statement) -> bool:
+    return bool(
+        statement._limit_clause is not None or statement._offset_clause is not None
+        or statement._group_by_clauses or statement._having_criteria or statement._distinct
+    )
+
+
+def _sort_key(statement, clause):
+    """Return (row -> value, descending) for an ORDER BY clause resolvable from the selected columns"""
+    descending = False
+    element = clause
+    if isinstance(element, UnaryExpression):
+        if element.modifier is operators.desc_op:
+            descending = True
+        elif element.modifier is not operators.asc_op:
+            raise UnsupportedPartitionQuery(f"Cannot merge ORDER BY {clause} across partitions")
+        element = element.element
+    for index, description in enumerate(statement.column_descriptions):
+        expr, entity = description["expr"], description["entity"]
+        if entity is not None and expr is entity:
+            table = inspect(entity).local_table
+            column_table = getattr(element, "table", None)
+            if getattr(column_table, "name", None) == table.name and element.key in table.c:
+                key = inspect(entity).get_property_by_column(table.c[element.key]).key
+                return (lambda row, i=index, k=key: getattr(row[i], k)), descending
+            continue
+        selected = expr.__clause_element__() if hasattr(expr, "__clause_element__") else expr
+        if selected is element or selected.compare(element) or (
+            isinstance(element, Label) and description["name"] == element.name
+        ):
+            return (lambda row, i=index: row[i]), descending
+    raise UnsupportedPartitionQuery(f"Cannot merge ORDER BY {clause} across partitions")
+
+
+def _merge_plan(statement):
+    """Return (per-partition statement, rows -> merged rows) for a select spanning partitions
+
+    Plain selects are concatenated, re-sorted by their ORDER BY and sliced by
+    LIMIT/OFFSET, with the limit pushed down to each partition. Selects made
+    only of count/sum/min/max are combined into one row. Anything else
+    (GROUP BY, DISTINCT, avg, limited subqueries, ...) is rejected rather than
+    returning per-partition results.
+    """
+    if not isinstance(statement, Select) or (
+        statement._group_by_clauses or statement._having_criteria or statement._distinct
+    ):
+        raise UnsupportedPartitionQuery("Query cannot be merged across partitions")
+    for from_ in statement.get_final_froms():
+        if any(isinstance(inner, Select) and _is_windowed(inner) for inner in visitors.iterate(from_)):
+            raise UnsupportedPartitionQuery("Subqueries with LIMIT, GROUP BY or DISTINCT cannot be merged across partitions")
+    try:
+        limit, offset = statement._limit, statement._offset or 0
+    except CompileError:
+        raise UnsupportedPartitionQuery("Only integer LIMIT/OFFSET can be merged across partitions")
+
+    columns = list(statement.selected_columns)
+    aggregates = [_aggregate_name(column) for column in columns]
+    if any(_contains_aggregate(column) for column in columns):
+        if None in aggregates:
+            raise UnsupportedPartitionQuery("Only count, sum, min and max can be merged across partitions")
+        sort_keys = []
+    else:
+        aggregates = None
+        sort_keys = [_sort_key(statement, clause) for clause in statement._order_by_clauses]
+
+    shard_statement = statement.offset(None)
+    if limit is not None:
+        shard_statement = shard_statement.limit(limit + offset)
+
+    def merge(rows):
+        if aggregates is not None:
+            rows = [[
+                _MERGEABLE_AGGREGATES[name]([row[i] for row in rows if row[i] is not None])
+                for i, name in enumerate(aggregates)
+            ]]
+        # Stable sorts from the last key to the first; NULLs sort lowest, as in SQLite
+        for value, descending in reversed(sort_keys):
+            rows.sort(key=lambda row: (value(row) is not None, value(row)), reverse=descending)
+        return rows[offset:None if limit is None else offset + limit]
+
+    return shard_statement, merge
+
+
+def _explicit_shard(orm_context):
+    """Return the shard pinned by set_shard_id, an identity token or bind arguments, as ShardedSession does"""
+    for option in orm_context._non_compile_orm_options:
+        if isinstance(option, set_shard_id):
+            return option.shard_id
+    if orm_context.load_options._identity_token is not None:
+        return orm_context.load_options._identity_token
+    return orm_context.execution_options.get("_sa_shard_id", orm_context.bind_arguments.get("shard_id"))
+
+
+def _table_name(mapper) -> Optional[str]:
+    if mapper is None:
+        return None
+    mapper = inspect(mapper, raiseerr=False)
+    table = getattr(mapper, "local_table", None)
+    return getattr(table, "name", None)
+
+
+class PartitionedSession(ShardedSession):
+    """Session routing orders and order items to their month partition
+
+    Selects spanning several partitions run on the registry's thread pool and
+    their rows are merged (see _merge_plan) before being returned.
+    """
+
+    def __init__(self, partitions: PartitionRegistry, **kwargs):
+        self.partitions = partitions
+        self._order_partitions = {}
+        self._has_writes = False
+        super().__init__(
+            shard_chooser=self._choose_shard,
+            identity_chooser=self._choose_identity_shards,
+            execute_chooser=self._choose_execute_shards,
+            **kwargs,
+        )
+        event.remove(self, "do_orm_execute", execute_and_instances)
+        event.listen(self, "do_orm_execute", self._execute, retval=True)
+        event.listen(self, "after_flush", self._mark_writes)
+        event.listen(self, "after_commit", self._clear_writes)
+        event.listen(self, "after_rollback", self._clear_writes)
+
+    def _mark_writes(self, *args):
+        self._has_writes = True
+
+    def _clear_writes(self, *args):
+        self._has_writes = False
+
+    def _is_partitioned(self, mapper) -> bool:
+        return _table_name(mapper) in PARTITIONED_TABLES
+
+    def _directory_connection(self):
+        return self.connection(bind_arguments={"shard_id": DEFAULT_PARTITION})
+
+    def _allocate_order_id(self, key: str) -> int:
+        result = self._directory_connection().execute(order_directory.insert().values(partition=key))
+        order_id = result.inserted_primary_key[0]
+        self._order_partitions[order_id] = key
+        return order_id
+
+    def _allocate_order_item_id(self, order_id) -> int:
+        result = self._directory_connection().execute(order_item_directory.insert().values(order_id=order_id))
+        return result.inserted_primary_key[0]
+
+    def order_partition(self, order_id) -> str:
+        """Return the partition holding an order, defaulting to pre-partitioning orders"""
+        key = self._order_partitions.get(order_id)
+        if key is None:
+            key = self._directory_connection().execute(
+                select(order_directory.c.partition).where(order_directory.c.id == order_id)
+            ).scalar()
+            key = key or DEFAULT_PARTITION
+            self._order_partitions[order_id] = key
+        return key
+
+    def _choose_shard(self, mapper, instance, clause=None):
+        table = _table_name(mapper)
+        if table == "orders" and instance is not None:
+            if instance.order_date is None:
+                instance.order_date = datetime.utcnow()
+            key = partition_key(instance.order_date)
+            if instance.id is None:
+                instance.id = self._allocate_order_id(key)
+            return key
+        if table == "order_items" and instance is not None:
+            if instance.order is not None:
+                key = self._choose_shard_and_assign(inspect(instance.order).mapper, instance.order)
+                order_id = instance.order.id
+            else:
+                order_id = instance.order_id
+                key = self.order_partition(order_id)
+            if instance.id is None:
+                instance.id = self._allocate_order_item_id(order_id)
+            return key
+        return DEFAULT_PARTITION
+
+    def _lazy_load_partition(self, lazy_loaded_from) -> Optional[str]:
+        """Return the parent's partition for a lazy load between partitioned tables
+
+        An order and its items always share a partition; customer.orders does not.
+        """
+        if lazy_loaded_from is not None and self._is_partitioned(lazy_loaded_from.mapper):
+            # Merged cross-partition loads only record the token in the identity key
+            if lazy_loaded_from.key is not None:
+                return lazy_loaded_from.key[2]
+            return lazy_loaded_from.identity_token
+        return None
+
+    def _choose_identity_shards(self, mapper, primary_key, *, lazy_loaded_from, **kw):
+        if not self._is_partitioned(mapper):
+            return [DEFAULT_PARTITION]
+        key = self._lazy_load_partition(lazy_loaded_from)
+        if key is not None:
+            return [key]
+        if _table_name(mapper) == "orders":
+            return [self.order_partition(primary_key[0])]
+        order_id = self._directory_connection().execute(
+            select(order_item_directory.c.order_id).where(order_item_directory.c.id == primary_key[0])
+        ).scalar()
+        if order_id is not None:
+            return [self.order_partition(order_id)]
+        # Items written before the item directory existed
+        return self.partitions.shards_for()
+
+    def _choose_execute_shards(self, orm_context):
+        if not self._is_partitioned(orm_context.bind_mapper):
+            return [DEFAULT_PARTITION]
+        key = self._lazy_load_partition(orm_context.lazy_loaded_from)
+        if key is not None:
+            return [key]
+        order_ids, start, end = _order_criteria(orm_context.statement, orm_context.parameters)
+        if order_ids is not None:
+            return sorted({self.order_partition(order_id) for order_id in order_ids})
+        return self.partitions.shards_for(start, end)
+
+    def _execute(self, orm_context):
+        if not orm_context.is_select:
+            self._has_writes = True
+            return execute_and_instances(orm_context)
+        shard = _explicit_shard(orm_context)
+        shards = [shard] if shard is not None else list(self.execute_chooser(orm_context))
+        if len(shards) == 1:
+            orm_context.update_execution_options(identity_token=shards[0])
+            return orm_context.invoke_statement(bind_arguments=dict(orm_context.bind_arguments, shard_id=shards[0]))
+        return self._execute_merged(orm_context, shards)
+
+    def _execute_merged(self, orm_context, shards):
+        statement = orm_context.statement
+        shard_statement, merge = _merge_plan(statement)
+        if self._has_writes or self.new or self.dirty or self.deleted:
+            # Uncommitted changes are only visible on this session's own connections
+            results = []
+            for key in shards:
+                orm_context.update_execution_options(identity_token=key)
+                results.append(orm_context.invoke_statement(
+                    statement=shard_statement,
+                    bind_arguments=dict(orm_context.bind_arguments, shard_id=key)
+                ).freeze())
+            in_session = True
+        else:
+            options = dict(orm_context.local_execution_options)
+
+            def run(key, session):
+                return session.execute(
+                    shard_statement, orm_context.parameters, execution_options=dict(options, identity_token=key)
+                ).freeze()
+
+            results = [result for _, result in self.partitions.map(run, shards)]
+            in_session = False
+
+        rows = merge([row for result in results for row in result.rewrite_rows()])
+        merged = results[0].with_new_rows([tuple(row) for row in rows])
+        if not in_session:
+            merged = merge_frozen_result(self, statement, merged, load=False)
+        return merged()
+
+    def get_bind(self, mapper=None, *, shard_id=None, instance=None, clause=None, **kw):
+        if mapper is not None and not self._is_partitioned(mapper):
+            return self.partitions.default_engine
+        if shard_id is None:
+            shard_id = self._choose_shard_and_assign(mapper, instance=instance, clause=clause)
+        return self.partitions.engine(shard_id)
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+import json
+from pydantic import BaseModel, EmailStr, field_validator
+from typing import Optional, List, Any
 from datetime import datetime
 
 # IMS Schemas
@@ -106,3 +107,54 @@ class OrderAnalytics(BaseModel):
     avg_order_value: float
     orders_by_status: dict
     top_selling_products: List[dict]
+
+class ValuationMetrics(BaseModel):
+    sku_count: int
+    inventory_value: float  # sum of unit_price * stock_quantity
+    low_stock_count: int
+    units_sold: int
+    revenue: float
+    sales_velocity: float  # units sold per day over the requested window
+
+class SupplierPerformance(ValuationMetrics):
+    supplier_id: int
+    supplier_name: str
+
+class CategoryValuation(ValuationMetrics):
+    category: Optional[str] = None
+
+class SupplierPerformancePage(BaseModel):
+    total: int
+    skip: int
+    limit: int
+    days: int
+    items: List[SupplierPerformance]
+
+class CategoryValuationPage(BaseModel):
+    total: int
+    skip: int
+    limit: int
+    days: int
+    items: List[CategoryValuation]
+
+# Job Schemas
+class Job(BaseModel):
+    id: int
+    kind: str
+    status: str
+    progress: float
+    message: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    cancel_requested: bool
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @field_validator("result", mode="before")
+    @classmethod
+    def decode_result(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,105 @@
+"""Measure API cold start: import-time breakdown and time to first request.
+
+Usage:
+    python startup_profile.py                 # print the report
+    python startup_profile.py --budget 2.5    # also exit 1 if time to first request exceeds 2.5s
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times(module="main"):
+    """Return (total seconds, {top-level package: cumulative seconds}) for importing module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE, capture_output=True, text=True, check=True
+    )
+    packages = defaultdict(float)
+    children = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        seconds = int(cumulative) / 1e6
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # Children are printed before their parent; keep only the profiled module's
+        if depth == 1:
+            children.append((name.strip().split(".")[0], seconds))
+        elif depth == 0:
+            if name.strip() == module:
+                total = seconds
+                for package, package_seconds in children:
+                    packages[package] += package_seconds
+            children = []
+    return total, dict(packages)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(path="/api/jobs", timeout=30.0, workdir=None):
+    """Start uvicorn in a fresh process and time until the first successful response
+
+    workdir is where the server creates its SQLite files (default: this directory).
+    Raises RuntimeError with the server's output if it exits before answering.
+    """
+    port = _free_port()
+    with tempfile.TemporaryFile(mode="w+") as output:
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", HERE,
+             "--host", "127.0.0.1", "--port", str(port)],
+            cwd=workdir or HERE, stdout=output, stderr=subprocess.STDOUT
+        )
+        try:
+            while time.perf_counter() - started < timeout:
+                if server.poll() is not None:
+                    output.seek(0)
+                    raise RuntimeError(f"Server exited with code {server.returncode}:\n{output.read()}")
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                        if response.status == 200:
+                            return time.perf_counter() - started
+                except OSError:
+                    time.sleep(0.02)
+            output.seek(0)
+            raise TimeoutError(f"Server did not answer {path} within {timeout}s:\n{output.read()}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, help="Maximum allowed time to first request in seconds")
+    parser.add_argument("--top", type=int, default=10, help="Number of packages to list")
+    args = parser.parse_args()
+
+    total, packages = import_times()
+    print(f"import main: {total:.3f}s")
+    for name, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:<24} {seconds:.3f}s")
+
+    first_request = time_to_first_request()
+    print(f"time to first request: {first_request:.3f}s")
+
+    if args.budget is not None and first_request > args.budget:
+        print(f"Cold start budget exceeded: {first_request:.3f}s > {args.budget:.3f}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
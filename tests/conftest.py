@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the application modules in the repository root importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
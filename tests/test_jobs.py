@@ -0,0 +1,138 @@
+import os
+import socket
+import threading
+import time
+from concurrent.futures import wait
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from jobs import CANCELLED, FAILED, FINISHED_STATES, QUEUED, RUNNING, SUCCEEDED, WORKER_ID, JobRunner, register_job
+from models import Job
+
+runs = []
+release = threading.Event()
+
+
+@register_job("test-record")
+def record_job(context, name):
+    runs.append(name)
+    return {"name": name}
+
+
+@register_job("test-block")
+def block_job(context):
+    release.wait(timeout=10)
+
+
+@register_job("test-loop")
+def loop_job(context):
+    runs.append("loop")
+    while True:
+        context.progress(0.5)
+        time.sleep(0.01)
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    runs.clear()
+    release.clear()
+    yield
+    release.set()
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine, tables=[Job.__table__])
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def make_runner(session_factory):
+    runners = []
+
+    def make(**kwargs):
+        runner = JobRunner(session_factory=session_factory, **kwargs)
+        runners.append(runner)
+        return runner
+
+    yield make
+    for runner in runners:
+        runner.shutdown()
+
+
+def add_job(session_factory, kind, status=QUEUED, worker=None, params="{}"):
+    with session_factory() as db:
+        job = Job(kind=kind, status=status, worker=worker, progress=0, params=params)
+        db.add(job)
+        db.commit()
+        return job.id
+
+
+def wait_for(runner, job_id, statuses=FINISHED_STATES, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = runner._get(job_id)
+        if job.status in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} still {job.status} after {timeout}s")
+
+
+def test_queued_job_is_claimed_by_one_runner(session_factory, make_runner):
+    job_id = add_job(session_factory, "test-record", params='{"name": "once"}')
+    # Stand-ins for worker processes on other hosts, so none looks dead to the others
+    runners = [make_runner(worker_id=f"worker-{n}:1:token") for n in range(4)]
+    for runner in runners:
+        runner.recover()
+    job = wait_for(runners[0], job_id)
+    for runner in runners:
+        with runner._lock:
+            futures = list(runner._futures.values())
+        wait(futures, timeout=5)
+    assert job.status == SUCCEEDED
+    assert runs == ["once"]
+
+
+def test_cancel_queued_job_never_runs(make_runner):
+    runner = make_runner(max_workers=1)
+    blocker = runner.submit("test-block")
+    queued = runner.submit("test-record", name="cancelled")
+    assert runner.cancel(queued.id).status == CANCELLED
+    release.set()
+    assert wait_for(runner, blocker.id).status == SUCCEEDED
+    assert runner._get(queued.id).status == CANCELLED
+    assert runs == []
+
+
+def test_cancel_running_job_stops_at_next_progress(make_runner):
+    runner = make_runner()
+    job = runner.submit("test-loop")
+    wait_for(runner, job.id, statuses=(RUNNING,))
+    runner.cancel(job.id)
+    job = wait_for(runner, job.id)
+    assert job.status == CANCELLED
+    assert job.worker == runner.worker_id
+    assert runs == ["loop"]
+
+
+def test_recover_fails_jobs_of_dead_workers_and_runs_queued(session_factory, make_runner):
+    host = socket.gethostname()
+    stale = add_job(session_factory, "test-record", RUNNING, worker=f"{host}:{os.getpid()}:earlier-process")
+    legacy_dead = add_job(session_factory, "test-record", RUNNING, worker=f"{host}:999999999")
+    live = add_job(session_factory, "test-record", RUNNING, worker=WORKER_ID)
+    remote = add_job(session_factory, "test-record", RUNNING, worker="another-host:1:token")
+    queued = add_job(session_factory, "test-record", params='{"name": "queued"}')
+
+    runner = make_runner()
+    runner.recover()
+
+    assert runner._get(stale).status == FAILED
+    assert runner._get(legacy_dead).status == FAILED
+    assert runner._get(live).status == RUNNING
+    assert runner._get(remote).status == RUNNING
+    assert wait_for(runner, queued).status == SUCCEEDED
+    assert runs == ["queued"]
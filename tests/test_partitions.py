@@ -0,0 +1,138 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, get_oms_db
+from main import app
+from models import Order, OrderItem
+from oms_partitions import PartitionRegistry, PartitionedSession, UnsupportedPartitionQuery
+
+MONTHS = [datetime(2024, 1, 15), datetime(2024, 2, 15), datetime(2024, 3, 15)]
+ORDERS_PER_MONTH = 4
+ITEMS_PER_ORDER = 3
+
+
+@pytest.fixture
+def partitions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'oms.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    registry = PartitionRegistry(engine, str(tmp_path / "oms_partitions"), Base.metadata)
+    registry.init()
+    return registry
+
+
+@pytest.fixture
+def session_factory(partitions):
+    return sessionmaker(class_=PartitionedSession, partitions=partitions, autoflush=False)
+
+
+@pytest.fixture
+def orders(session_factory):
+    """Create ORDERS_PER_MONTH orders with ITEMS_PER_ORDER items in each of MONTHS; return {id: total}"""
+    with session_factory() as db:
+        created = []
+        for month_index, month in enumerate(MONTHS):
+            for n in range(ORDERS_PER_MONTH):
+                order = Order(
+                    customer_id=1, status="pending", total_amount=100.0 * month_index + n,
+                    order_date=month.replace(day=n + 1), shipping_address="1 Main St"
+                )
+                order.items = [
+                    OrderItem(product_sku=f"SKU-{i}", quantity=i + 1, unit_price=2.0, total_price=2.0 * (i + 1))
+                    for i in range(ITEMS_PER_ORDER)
+                ]
+                db.add(order)
+                created.append(order)
+        db.commit()
+        return {order.id: order.total_amount for order in created}
+
+
+@pytest.fixture
+def executed():
+    """Record the database file each statement runs against"""
+    databases = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        databases.append(conn.engine.url.database.rsplit("/", 1)[-1])
+
+    event.listen(Engine, "before_cursor_execute", record)
+    yield databases
+    event.remove(Engine, "before_cursor_execute", record)
+
+
+def test_date_range_skips_other_partitions(session_factory, orders, executed):
+    with session_factory() as db:
+        found = db.query(Order).filter(
+            Order.order_date >= datetime(2024, 2, 1), Order.order_date < datetime(2024, 2, 28)
+        ).all()
+    assert len(found) == ORDERS_PER_MONTH
+    assert {order.order_date.month for order in found} == {2}
+    assert set(executed) == {"oms.db", "oms_2024_02.db"}
+
+
+def test_order_by_limit_offset_merged_across_partitions(session_factory, orders):
+    expected = sorted(orders.items(), key=lambda item: item[1], reverse=True)[2:7]
+    with session_factory() as db:
+        found = db.query(Order).order_by(Order.total_amount.desc()).offset(2).limit(5).all()
+    assert [(order.id, order.total_amount) for order in found] == expected
+
+
+def test_count_and_sum_merged_across_partitions(session_factory, orders):
+    with session_factory() as db:
+        assert db.query(Order).count() == len(orders)
+        assert db.query(func.sum(Order.total_amount)).scalar() == sum(orders.values())
+        assert db.execute(select(func.count(OrderItem.id))).scalar() == len(orders) * ITEMS_PER_ORDER
+
+
+@pytest.mark.parametrize("query", [
+    lambda db: db.query(Order.status, func.count(Order.id)).group_by(Order.status).all(),
+    lambda db: db.query(func.avg(Order.total_amount)).scalar(),
+])
+def test_unmergeable_queries_are_rejected(session_factory, orders, query):
+    with session_factory() as db, pytest.raises(UnsupportedPartitionQuery):
+        query(db)
+
+
+def test_lazy_items_load_stays_in_order_partition(session_factory, orders, executed):
+    order_id = next(iter(orders))
+    with session_factory() as db:
+        order = db.get(Order, order_id)
+        executed.clear()
+        items = order.items
+    assert len(items) == ITEMS_PER_ORDER
+    assert executed == ["oms_2024_01.db"]
+
+
+def test_order_item_ids_are_unique_across_partitions(session_factory, orders):
+    with session_factory() as db:
+        items = db.query(OrderItem).all()
+        ids = [item.id for item in items]
+        assert len(set(ids)) == len(ids) == len(orders) * ITEMS_PER_ORDER
+        latest = max(items, key=lambda item: item.order_id)
+        db.expunge_all()
+        item = db.get(OrderItem, latest.id)
+        assert (item.order_id, item.product_sku) == (latest.order_id, latest.product_sku)
+
+
+def test_get_order_returns_410_once_partition_detached(session_factory, partitions, orders):
+    order_id = next(iter(orders))
+
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_oms_db] = get_db
+    try:
+        client = TestClient(app)
+        assert client.get(f"/api/orders/{order_id}").status_code == 200
+        partitions.detach("2024_01")
+        assert client.get(f"/api/orders/{order_id}").status_code == 410
+    finally:
+        app.dependency_overrides.pop(get_oms_db, None)
@@ -0,0 +1,21 @@
+import subprocess
+import sys
+
+from startup_profile import HERE, time_to_first_request
+
+# Seconds from spawning uvicorn to the first successful response
+COLD_START_BUDGET = 3.0
+
+# Dependencies that must only be imported by the routes that use them
+DEFERRED_IMPORTS = ("pandas", "faker")
+
+
+def test_import_main_defers_heavy_dependencies():
+    code = f"import sys, main; print(','.join(m for m in {DEFERRED_IMPORTS!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+
+def test_time_to_first_request_within_budget(tmp_path):
+    elapsed = time_to_first_request(workdir=tmp_path)
+    assert elapsed < COLD_START_BUDGET, f"Cold start took {elapsed:.2f}s, budget is {COLD_START_BUDGET:.2f}s"
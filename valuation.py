@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, case, func, select
+from sqlalchemy.orm import Session
+
+from database import oms_partitions
+from models import Product, Supplier, Order, OrderItem
+
+# Per-SKU sales for the requested window, loaded into a temporary table on the
+# IMS connection so it can be joined against products by SKU
+_sales_metadata = MetaData()
+sku_sales = Table(
+    "sku_sales",
+    _sales_metadata,
+    Column("sku", String, primary_key=True),
+    Column("units_sold", Integer),
+    Column("revenue", Float),
+    prefixes=["TEMPORARY"],
+)
+
+def sales_by_sku(since: datetime) -> dict:
+    """Return {sku: (units_sold, revenue)} for non-cancelled orders placed since the given date"""
+    def query(session: Session):
+        return session.execute(
+            select(OrderItem.product_sku, func.sum(OrderItem.quantity), func.sum(OrderItem.total_price))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(Order.order_date >= since, Order.status != "cancelled")
+            .group_by(OrderItem.product_sku)
+        ).all()
+
+    totals = {}
+    for rows in oms_partitions.fan_out(query, start=since):
+        for sku, units, revenue in rows:
+            prev_units, prev_revenue = totals.get(sku, (0, 0.0))
+            totals[sku] = (prev_units + (units or 0), prev_revenue + (revenue or 0.0))
+    return totals
+
+
+def _metric_columns(days: int):
+    units_sold = func.coalesce(func.sum(sku_sales.c.units_sold), 0)
+    return [
+        func.count(Product.id).label("sku_count"),
+        func.coalesce(func.sum(Product.unit_price * Product.stock_quantity), 0.0).label("inventory_value"),
+        func.coalesce(
+            func.sum(case((Product.stock_quantity <= Product.reorder_point, 1), else_=0)), 0
+        ).label("low_stock_count"),
+        units_sold.label("units_sold"),
+        func.coalesce(func.sum(sku_sales.c.revenue), 0.0).label("revenue"),
+        (units_sold * 1.0 / days).label("sales_velocity"),
+    ]
+
+
+def valuation_page(ims_db: Session, dimension: str, days: int, sort_by: str, descending: bool,
+                   skip: int, limit: int) -> dict:
+    """Aggregate valuation, low stock and sales velocity per supplier or category in one grouped query"""
+    since = datetime.utcnow() - timedelta(days=days)
+    sales = sales_by_sku(since)
+
+    conn = ims_db.connection()
+    sku_sales.drop(conn, checkfirst=True)
+    sku_sales.create(conn)
+    try:
+        if sales:
+            conn.execute(
+                sku_sales.insert(),
+                [{"sku": sku, "units_sold": units, "revenue": revenue} for sku, (units, revenue) in sales.items()]
+            )
+
+        if dimension == "supplier":
+            grouped = (
+                select(Supplier.id.label("supplier_id"), Supplier.name.label("supplier_name"))
+                .select_from(Supplier)
+                .outerjoin(Product, Product.supplier_id == Supplier.id)
+                .group_by(Supplier.id, Supplier.name)
+            )
+            tiebreak = Supplier.id
+        else:
+            grouped = select(Product.category.label("category")).select_from(Product).group_by(Product.category)
+            tiebreak = Product.category
+        # Count the groups themselves (not distinct keys) so a NULL category is included
+        total = ims_db.execute(select(func.count()).select_from(grouped.subquery())).scalar()
+        query = grouped.add_columns(*_metric_columns(days)).outerjoin(sku_sales, sku_sales.c.sku == Product.sku)
+
+        sort_column = query.selected_columns[sort_by]
+        query = query.order_by(sort_column.desc() if descending else sort_column.asc(), tiebreak)
+        items = [dict(row._mapping) for row in ims_db.execute(query.offset(skip).limit(limit))]
+    finally:
+        sku_sales.drop(conn)
+
+    return {"total": total, "skip": skip, "limit": limit, "days": days, "items": items}